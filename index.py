@@ -1,9 +1,17 @@
 from jobspy import scrape_jobs
 import requests
 import os
+import csv
+import numpy as np
 import pandas as pd
 import time
+import math
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 import logging
 import argparse
 
@@ -13,18 +21,218 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-OUTPUT_DIR = ""
-def get_company_linkedin_id(company_name: str) -> str | None:
+
+# Companies are scraped concurrently; keep this low enough to avoid LinkedIn bans.
+MAX_WORKERS = 8
+# Serializes appends to the shared record files from worker threads.
+_RECORD_LOCK = threading.Lock()
+# Output files stay open for the whole run and rely on block buffering, not per-row flushes.
+WRITE_BUFFER_SIZE = 1 << 20
+_record_writers: dict[str, tuple] = {}
+
+# Resolved LinkedIn IDs persist across runs; company IDs are stable over a week.
+# SQLite handles concurrent --start/--end shards writing the same file.
+COMPANY_ID_CACHE_FILE = "company_id_cache.db"
+COMPANY_ID_TTL = 7 * 24 * 60 * 60
+# name -> {'id', 'ts', 'last_job_count'}
+_company_id_cache: dict[str, dict] = {}
+_cache_conn: sqlite3.Connection | None = None
+# Job counts updated this run, flushed in one batch by close_company_id_cache
+_pending_job_counts: dict[str, dict] = {}
+_CACHE_LOCK = threading.Lock()
+
+# Token bucket shared by every request to LinkedIn; replaces the fixed per-company sleep.
+LINKEDIN_HOST = "www.linkedin.com"
+LINKEDIN_RATE = 2.0
+LINKEDIN_BURST = 10
+# X-RateLimit-Reset values above this are epoch timestamps rather than seconds to wait
+RATE_LIMIT_EPOCH_THRESHOLD = 1e9
+# Upper bound on a header-driven pause, so a bad value cannot stall the workers indefinitely
+RATE_LIMIT_MAX_PAUSE = 15 * 60
+# Typeahead attempts per company when LinkedIn answers 429, each taking a limiter token
+TYPEAHEAD_MAX_ATTEMPTS = 4
+# Base of the exponential backoff used when a 429 carries no usable Retry-After
+RATE_LIMIT_BACKOFF = 2.0
+# jobspy's LinkedIn scraper pages through guest search results this many at a time
+LINKEDIN_PAGE_SIZE = 10
+# Options shared by every jobspy call; only the company ID and location vary per request
+SCRAPE_JOBS_KWARGS = dict(site_name="linkedin", hours_old=720)
+
+# Shared session so the typeahead lookups reuse one keep-alive connection to
+# linkedin.com instead of paying a fresh TCP+TLS handshake per company.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    # 429s are not retried here (Retry-After would otherwise re-enable them); get_company_linkedin_id
+    # backs off through RATE_LIMITER instead
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504],
+                      respect_retry_after_header=False),
+))
+SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+
+
+class RateLimiter:
+    """Thread-safe per-host token bucket that also honours X-RateLimit-* response headers."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, tokens: float = 1):
+        """Block until `tokens` requests to host are allowed."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                available, last = self._buckets.get(host, (self.capacity, now))
+                available = min(self.capacity, available + (now - last) * self.rate)
+                wait = self._blocked_until.get(host, 0) - now
+                if wait <= 0 and available >= tokens:
+                    self._buckets[host] = (available - tokens, now)
+                    return
+                self._buckets[host] = (available, now)
+                wait = max(wait, (tokens - available) / self.rate)
+            time.sleep(wait)
+
+    def update(self, host: str, headers):
+        """Pause the host until its advertised reset once the server reports no requests remaining."""
+        try:
+            remaining = int(headers['x-ratelimit-remaining'])
+            reset = float(headers['x-ratelimit-reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        if remaining > 0:
+            return
+
+        # The reset header is either an epoch timestamp or a number of seconds
+        self.block(host, reset - time.time() if reset > RATE_LIMIT_EPOCH_THRESHOLD else reset)
+
+    def block(self, host: str, seconds: float):
+        """Stop handing out tokens for host for the given number of seconds (clamped)."""
+        seconds = min(max(0.0, seconds), RATE_LIMIT_MAX_PAUSE)
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0), now + seconds)
+            self._buckets[host] = (0, now)
+
+
+RATE_LIMITER = RateLimiter(LINKEDIN_RATE, LINKEDIN_BURST)
+
+
+def _cache_key(company_name) -> str:
+    return str(company_name).lower().strip()
+
+
+def open_company_id_cache(path: str = COMPANY_ID_CACHE_FILE):
+    """Open the persistent ID cache for the run and load its unexpired entries into memory."""
+    global _cache_conn
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS company_ids ("
+        "name TEXT PRIMARY KEY, id TEXT NOT NULL, ts REAL NOT NULL, last_job_count INTEGER)"
+    )
+    rows = conn.execute(
+        "SELECT name, id, ts, last_job_count FROM company_ids WHERE ts > ?",
+        (time.time() - COMPANY_ID_TTL,),
+    )
+    with _CACHE_LOCK:
+        for name, company_id, ts, last_job_count in rows:
+            _company_id_cache[name] = {'id': company_id, 'ts': ts, 'last_job_count': last_job_count}
+        _cache_conn = conn
+
+
+def close_company_id_cache():
+    """Write this run's job counts in one transaction and close the persistent ID cache."""
+    global _cache_conn
+    with _CACHE_LOCK:
+        if _cache_conn is None:
+            return
+        try:
+            job_counts = [(entry['last_job_count'], key) for key, entry in _pending_job_counts.items()]
+            with _cache_conn:
+                _cache_conn.executemany("UPDATE company_ids SET last_job_count = ? WHERE name = ?", job_counts)
+        except sqlite3.Error as e:
+            logger.error(f"Error saving job counts to the company ID cache: {str(e)}")
+        finally:
+            _pending_job_counts.clear()
+            try:
+                _cache_conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing the company ID cache: {str(e)}")
+            finally:
+                _cache_conn = None
+
+
+def get_cached_company_id(company_name: str) -> str | None:
+    """Return a cached LinkedIn company ID if one was resolved within the TTL."""
+    with _CACHE_LOCK:
+        entry = _company_id_cache.get(_cache_key(company_name))
+    if entry is None or time.time() - entry['ts'] >= COMPANY_ID_TTL:
+        return None
+    return entry['id']
+
+
+def cache_company_id(company_name: str, company_id: str):
+    """Remember a resolved LinkedIn company ID in memory and on disk."""
+    key = _cache_key(company_name)
+    entry = {'id': company_id, 'ts': time.time(), 'last_job_count': None}
+    with _CACHE_LOCK:
+        _company_id_cache[key] = entry
+        if _cache_conn is None:
+            return
+        # A failed disk write only costs a lookup on the next run; never fail the current one
+        try:
+            with _cache_conn:
+                _cache_conn.execute(
+                    "INSERT OR REPLACE INTO company_ids (name, id, ts, last_job_count) VALUES (?, ?, ?, NULL)",
+                    (key, str(company_id), entry['ts']),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error persisting LinkedIn ID for {company_name}: {str(e)}")
+
+
+def record_job_count(company_name: str, job_count: int):
+    """Record the number of jobs last scraped for a cached company; written to disk on close."""
+    key = _cache_key(company_name)
+    with _CACHE_LOCK:
+        entry = _company_id_cache.get(key)
+        if entry is None:
+            return
+        entry['last_job_count'] = job_count
+        _pending_job_counts[key] = entry
+
+
+def get_company_linkedin_id(company_name: str, output_dir: str) -> str | None:
     """Get LinkedIn company ID with error handling and rate limiting."""
     try:
+        company_id = get_cached_company_id(company_name)
+        if company_id is not None:
+            return company_id
+
         # URL encode company name to handle special characters
         url = f'https://www.linkedin.com/jobs-guest/api/typeaheadHits?typeaheadType=COMPANY&query={company_name}'
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
+        # 5xx failures are retried by the session adapter; 429s back off through the limiter so
+        # every attempt takes a token and all workers pause together
+        for attempt in range(TYPEAHEAD_MAX_ATTEMPTS):
+            RATE_LIMITER.acquire(LINKEDIN_HOST)
+            response = SESSION.get(url, timeout=10)
+            RATE_LIMITER.update(LINKEDIN_HOST, response.headers)
+            if response.status_code != 429:
+                break
+            try:
+                retry_after = float(response.headers['retry-after'])
+            except (KeyError, TypeError, ValueError):
+                retry_after = RATE_LIMIT_BACKOFF ** (attempt + 1)
+            logger.warning(f"Rate limited looking up {company_name}; backing off {retry_after:.1f}s")
+            RATE_LIMITER.block(LINKEDIN_HOST, retry_after)
         response.raise_for_status()  # Raise exception for bad status codes
 
         data = response.json()
@@ -34,55 +242,78 @@ def get_company_linkedin_id(company_name: str) -> str | None:
             return None
 
         company_id = data[0]['id']
+        cache_company_id(company_name, company_id)
         return company_id
 
     except requests.exceptions.JSONDecodeError:
         logger.error(f"Failed to decode JSON for company: {company_name}")
-        save_error_records(company_name, "JSONDecodeError: Failed to decode JSON", OUTPUT_DIR)
+        save_error_records(company_name, "JSONDecodeError: Failed to decode JSON", output_dir)
         return None
     except RequestException as e:
         logger.error(f"Request failed for company {company_name}: {str(e)}")
-        save_error_records(company_name, f"RequestException: {str(e)}", OUTPUT_DIR)
+        save_error_records(company_name, f"RequestException: {str(e)}", output_dir)
         return None
     except Exception as e:
         logger.error(f"Unexpected error for company {company_name}: {str(e)}")
-        save_error_records(company_name, f"UnexpectedError: {str(e)}", OUTPUT_DIR)
+        save_error_records(company_name, f"UnexpectedError: {str(e)}", output_dir)
         return None
 
-def scrape_company_linkedin_jobs(company_name: str, location: str, fallback_company_name: str | None =None):
-    """Scrape jobs with error handling and fallback to another company name."""
+def resolve_ids(companies: list[str], output_dir: str, workers: int = MAX_WORKERS) -> dict[str, str]:
+    """Resolve LinkedIn IDs for all companies up front using a worker pool.
+
+    IDs are returned as LinkedIn gave them; conversion happens per company when scraping.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        company_ids = executor.map(lambda company: get_company_linkedin_id(company, output_dir), companies)
+        return {company: company_id for company, company_id in zip(companies, company_ids)
+                if company_id is not None}
+
+
+def scrape_jobs_for_id(company_id: int, location: str) -> pd.DataFrame:
+    """Run jobspy for one company ID, taking a rate-limiter token for every page it fetched."""
+    RATE_LIMITER.acquire(LINKEDIN_HOST)
+    jobs = scrape_jobs(**SCRAPE_JOBS_KWARGS, linkedin_company_ids=[company_id], location=location)
+    extra_pages = max(0, math.ceil(len(jobs) / LINKEDIN_PAGE_SIZE) - 1)
+    if extra_pages:
+        RATE_LIMITER.acquire(LINKEDIN_HOST, extra_pages)
+    return jobs
+
+
+def scrape_company_linkedin_jobs(company_name: str, location: str, output_dir: str, fallback_company_name: str | None =None,
+                                 company_ids: dict[str, str] | None = None):
+    """Scrape jobs with error handling and fallback to another company name.
+
+    If company_ids is given, the primary company's ID is taken from it instead of the typeahead.
+    """
     try:
         # Attempt to scrape jobs with the provided company name
-        company_id = get_company_linkedin_id(company_name)
+        if company_ids is not None:
+            company_id = company_ids.get(company_name)
+        else:
+            company_id = get_company_linkedin_id(company_name, output_dir)
         if company_id is None:
             logger.warning(f"No LinkedIn ID found for company: {company_name}")
             return pd.DataFrame()
 
         company_id = int(company_id)
-        jobs = scrape_jobs(
-            site_name="linkedin",
-            linkedin_company_ids=[company_id],
-            location=location,
-            hours_old=720,
-        )
+        jobs = scrape_jobs_for_id(company_id, location)
+        record_job_count(company_name, len(jobs))
 
         # If jobs are empty and fallback is available, try with fallback company name
         if jobs.empty and fallback_company_name:
             logger.info(f"No jobs found for {company_name}. Retrying with fallback: {fallback_company_name}")
-            company_id = get_company_linkedin_id(fallback_company_name,)
+            company_id = get_company_linkedin_id(fallback_company_name, output_dir)
             if company_id is None:
                 logger.warning(f"No LinkedIn ID found for fallback company: {fallback_company_name}")
                 return pd.DataFrame()
 
             company_id = int(company_id)
-            jobs = scrape_jobs(
-                site_name="linkedin",
-                linkedin_company_ids=[company_id],
-                location=location,
-                hours_old=720,
-            )
+            jobs = scrape_jobs_for_id(company_id, location)
+            record_job_count(fallback_company_name, len(jobs))
 
-        print(jobs)
+        logger.info(f"Company {company_name}: {len(jobs)} jobs")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(jobs.head().to_string())
 
         return jobs
 
@@ -90,15 +321,38 @@ def scrape_company_linkedin_jobs(company_name: str, location: str, fallback_comp
         logger.error(f"Error scraping jobs for {company_name}: {str(e)}")
         return pd.DataFrame()
 
+def get_record_writer(output_file: str, header: list[str]):
+    """Return a buffered csv writer for output_file, opening it on first use.
+
+    Callers must hold _RECORD_LOCK.
+    """
+    if output_file not in _record_writers:
+        fh = open(output_file, 'a', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        writer = csv.writer(fh, lineterminator=os.linesep)
+        # Append mode starts at the end of the file, so position 0 means it is new or empty
+        if fh.tell() == 0:
+            writer.writerow(header)
+        _record_writers[output_file] = (fh, writer)
+    return _record_writers[output_file][1]
+
+
+def close_record_writers():
+    """Flush and close every record file opened during the run."""
+    with _RECORD_LOCK:
+        for output_file, (fh, _) in _record_writers.items():
+            try:
+                fh.close()
+            except Exception as e:
+                logger.error(f"Error closing {output_file}: {str(e)}")
+        _record_writers.clear()
+
+
 def save_empty_or_none_records(company_name: str, output_dir: str):
     """Save records for companies with no jobs found."""
     try:
         output_file = os.path.join(output_dir, "no_jobs_found.csv")
-        df = pd.DataFrame({"Company": [company_name]})
-        if not os.path.exists(output_file):
-            df.to_csv(output_file, index=False)
-        else:
-            df.to_csv(output_file, mode='a', header=False, index=False)
+        with _RECORD_LOCK:
+            get_record_writer(output_file, ["Company"]).writerow([company_name])
     except Exception as e:
         logger.error(f"Error saving no-jobs-found record for {company_name}: {str(e)}")
 
@@ -107,29 +361,37 @@ def save_error_records(company_name: str, error_message: str, output_dir: str):
     """Save records for companies where an error occurred."""
     try:
         output_file = os.path.join(output_dir, "error_records.csv")
-        df = pd.DataFrame({"Company": [company_name], "Error": [error_message]})
-        if not os.path.exists(output_file):
-            df.to_csv(output_file, index=False)
-        else:
-            df.to_csv(output_file, mode='a', header=False, index=False)
+        with _RECORD_LOCK:
+            get_record_writer(output_file, ["Company", "Error"]).writerow([company_name, error_message])
     except Exception as e:
         logger.error(f"Error saving error record for {company_name}: {str(e)}")
 
 
-def run_through_csv(csv_file, location, output_dir, start_idx=0, end_idx=None):
-    """Process CSV with error handling and rate limiting."""
+def process_company(company_name: str, location: str, output_dir: str, fallback_company_name: str | None = None,
+                    company_ids: dict[str, str] | None = None):
+    """Scrape one company in a worker thread, returning (jobs, error_message)."""
+    try:
+        return scrape_company_linkedin_jobs(company_name, location, output_dir, fallback_company_name, company_ids), None
+    except Exception as e:
+        return pd.DataFrame(), str(e)
+
+
+def run_through_csv(csv_file, location, output_dir, start_idx=0, end_idx=None, workers=MAX_WORKERS):
+    """Process CSV concurrently with error handling and rate limiting."""
     try:
-        OUTPUT_DIR = output_dir
         if not os.path.exists(csv_file):
             logger.error(f"CSV file not found: {csv_file}")
             return
 
-        df = pd.read_csv(csv_file)
+        # Only the name columns are used; skip parsing the rest of the export
+        df = pd.read_csv(csv_file, usecols=lambda column: column in ('Company', 'Company Name for Emails'))
 
         if 'Company' not in df.columns:
             logger.error("CSV file must contain a 'Company' column")
             return
 
+        df['Company'] = df['Company'].map(lambda name: name.strip() if isinstance(name, str) else name)
+
         total_rows = len(df)
         if end_idx is None or end_idx >= total_rows:
             end_idx = total_rows - 1
@@ -147,44 +409,78 @@ def run_through_csv(csv_file, location, output_dir, start_idx=0, end_idx=None):
         if not os.path.exists(output_file):
             pd.DataFrame().to_csv(output_file, index=False)
 
+        companies = df['Company'].to_numpy(dtype=object)
+        if 'Company Name for Emails' in df.columns:
+            # Blank cells come through as NaN, which is truthy; normalise them to None
+            fallbacks = df['Company Name for Emails'].to_numpy(dtype=object)
+            fallbacks[pd.isna(df['Company Name for Emails']).to_numpy()] = None
+        else:
+            fallbacks = np.full(len(df), None, dtype=object)
+        missing = pd.isna(df['Company']).to_numpy()
+
+        # Each unique company is scraped once, before any requests are issued
+        rows = []
+        seen = set()
         for idx in range(start_idx, end_idx + 1):
-            company = df['Company'].iloc[idx]
-            company_fallback = df['Company Name for Emails'].iloc[idx] if 'Company Name for Emails' in df.columns else None
-            if pd.isna(company):
+            company = companies[idx]
+            company_fallback = fallbacks[idx]
+            if missing[idx] or company in seen:
                 continue
+            seen.add(company)
+            rows.append((idx, company, company_fallback))
 
-            logger.info(f"Processing company {idx + 1}/{end_idx + 1}: {company}")
+        open_company_id_cache()
 
-            try:
-                jobs = scrape_company_linkedin_jobs(company, location, company_fallback)
+        # Resolve every LinkedIn ID first so lookups and scraping can be paced independently
+        company_ids = resolve_ids([company for _, company, _ in rows], output_dir, workers)
+
+        # Workers only scrape; results are written here, in input order, by a single thread
+        with open(output_file, 'a', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as jobs_fh, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda row: process_company(row[1], location, output_dir, row[2], company_ids), rows)
 
-                if jobs.empty:
+            for (idx, company, _), (jobs, error_message) in zip(rows, results):
+                logger.info(f"Processed company {idx + 1}/{end_idx + 1}: {company}")
+
+                if error_message is not None:
+                    logger.error(f"Error processing company {company}: {error_message}")
+                    save_error_records(company, error_message, output_dir)
+                elif jobs.empty:
                     save_empty_or_none_records(company, output_dir)
                 else:
-                    # Append without writing index and only write header if file is empty
-                    jobs.to_csv(output_file, mode='a', header=False, index=False)
-
-            except Exception as e:
-                error_message = str(e)
-                logger.error(f"Error processing company {company}: {error_message}")
-                save_error_records(company, error_message, output_dir)
+                    try:
+                        # Append without writing index and only write header if file is empty
+                        jobs.to_csv(jobs_fh, header=False, index=False)
+                    except Exception as e:
+                        error_message = str(e)
+                        logger.error(f"Error processing company {company}: {error_message}")
+                        save_error_records(company, error_message, output_dir)
 
-            print("\n")
-            time.sleep(1)
+                print("\n")
 
     except Exception as e:
         logger.error(f"Error processing CSV: {str(e)}")
+    finally:
+        try:
+            close_record_writers()
+        except Exception as e:
+            logger.error(f"Error closing record files: {str(e)}")
+        try:
+            close_company_id_cache()
+        except Exception as e:
+            logger.error(f"Error closing company ID cache: {str(e)}")
 
 
 
 def parse_arguments():
     """Parse command-line arguments."""
-    parser = argparse.ArgumentParser(description='LinkedIn Job Scraper with sequential processing')
+    parser = argparse.ArgumentParser(description='LinkedIn Job Scraper with concurrent processing')
     parser.add_argument('csv_file', help='Input CSV file containing company names')
     parser.add_argument('location', help='Location to search for jobs')
     parser.add_argument('output_dir', help='Directory to save output files')
     parser.add_argument('--start', type=int, default=0, help='Starting index (0-based, inclusive)')
     parser.add_argument('--end', type=int, help='Ending index (0-based, inclusive)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='Number of companies scraped concurrently')
     return parser.parse_args()
 
 
@@ -195,5 +491,6 @@ if __name__ == "__main__":
         args.location,
         args.output_dir,
         start_idx=args.start,
-        end_idx=args.end
+        end_idx=args.end,
+        workers=args.workers
     )